@@ -10,5 +10,5 @@
 # limitations under the License.
 
 from .datasets import CrossValidation, DecathlonDataset, MedNISTDataset
-from .mmars import MODEL_DESC, RemoteMMARKeys, download_mmar, load_from_mmar
+from .mmars import MODEL_DESC, MMARSpec, RemoteMMARKeys, download_mmar, load_from_mmar
 from .utils import check_hash, download_and_extract, download_url, extractall
@@ -10,4 +10,4 @@
 # limitations under the License.
 
 from .mmars import download_mmar, load_from_mmar
-from .model_desc import MODEL_DESC, RemoteMMARKeys
+from .model_desc import MODEL_DESC, MMARSpec, RemoteMMARKeys
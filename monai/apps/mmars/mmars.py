@@ -16,37 +16,181 @@ See Also:
     - https://docs.nvidia.com/clara/clara-train-sdk/pt/mmar.html
 """
 
+import copy
+import http.client
+import io
 import json
 import os
+import pickle
+import shutil
+import tempfile
+import threading
 import warnings
-from typing import Mapping
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, Mapping, Optional, Tuple
+from urllib.error import ContentTooShortError
+from urllib.request import Request, urlopen
 
+import numpy as np
 import torch
 
-import monai.networks.nets as monai_nets
 from monai.apps.utils import download_and_extract
-from monai.utils.module import optional_import
+from monai.utils.module import has_option, min_version, optional_import
 
-from .model_desc import MODEL_DESC
-from .model_desc import RemoteMMARKeys as Keys
+from .model_desc import MODEL_DESC, MMARSpec
+
+orjson, has_orjson = optional_import("orjson")
+get_dir, has_home = optional_import("torch.hub", name="get_dir")
+
+if TYPE_CHECKING:
+    from tqdm import tqdm
+
+    has_tqdm = True
+else:
+    tqdm, has_tqdm = optional_import("tqdm", "4.47.0", min_version, "tqdm")
 
 __all__ = ["download_mmar", "load_from_mmar"]
 
+# model files up to this size are read into memory before deserializing
+PRELOAD_MAX_BYTES = 4 << 30  # 4 GiB
+
+# remote archives are downloaded by up to `RANGE_MAX_WORKERS` concurrent requests of at least `RANGE_PART_BYTES`
+RANGE_PART_BYTES = 64 << 20  # 64 MiB
+RANGE_MAX_WORKERS = 8
+RANGE_TIMEOUT = 60.0  # seconds
+
+# tensor offsets in the flat weights file are aligned to this number of bytes
+FLAT_ALIGN_BYTES = 4096
+
+# model files are read by this thread pool while `load_from_mmar` parses the config file
+_READ_POOL = ThreadPoolExecutor(max_workers=4)
+
+# pretrained weights with more entries than this are copied into the network module by a thread pool
+PARALLEL_LOAD_MIN_KEYS = 256
+
+# `_load_from_state_dict` implementations which are equivalent to copying the tensors if the keys match exactly
+_DEFAULT_LOADERS = {
+    torch.nn.Module._load_from_state_dict,
+    torch.nn.modules.batchnorm._BatchNorm._load_from_state_dict,
+    torch.nn.modules.instancenorm._InstanceNorm._load_from_state_dict,
+}
+
+# model specifications indexed by the normalized model ID
+_MODEL_BY_ID = {cand.id.strip().lower(): cand for cand in MODEL_DESC}
+
+# objects loaded by `load_from_mmar(..., use_cache=True)`
+_LOAD_CACHE: Dict[Tuple, Any] = {}
 
-def _get_model_spec(idx):
-    """get model specification by `idx`. `idx` could be index of the constant tuple of dict or the actual model ID."""
+
+def _get_model_spec(idx) -> MMARSpec:
+    """
+    get model specification by `idx`. `idx` could be index of the constant tuple of `MMARSpec`, the actual model ID,
+    or a mapping with the `RemoteMMARKeys` keys.
+    """
+    if isinstance(idx, MMARSpec):
+        return idx
+    if isinstance(idx, Mapping):
+        unknown = [key for key in idx if key not in MMARSpec._fields]
+        if unknown:
+            warnings.warn(f"Unknown MMAR keys {unknown} are ignored, the known keys are {MMARSpec._fields}.")
+        missing = [key for key in MMARSpec._fields if key not in idx and key not in MMARSpec._field_defaults]
+        if missing:
+            raise KeyError(f"Missing MMAR keys {missing} in {idx}.")
+        return MMARSpec(**{key: idx[key] for key in MMARSpec._fields if key in idx})
     if isinstance(idx, int):
         return MODEL_DESC[idx]
     if isinstance(idx, str):
-        key = idx.strip().lower()
-        for cand in MODEL_DESC:
-            if cand[Keys.ID].strip().lower() == key:
-                return cand
+        spec = _MODEL_BY_ID.get(idx.strip().lower())
+        if spec is not None:
+            return spec
     print(f"Available specs are: {MODEL_DESC}.")
     raise ValueError(f"Unknown MODEL_DESC request: {idx}")
 
 
-def download_mmar(item, mmar_dir=None, progress: bool = True):
+def _is_extracted(item: MMARSpec, model_dir: str, hash_file: str) -> bool:
+    """
+    Whether the MMAR of `item` is already extracted in `model_dir`.
+    If the expected hash value is specified, it is compared with the one recorded in `hash_file`
+    when the archive was verified, to avoid hashing the archive again.
+    """
+    if not os.path.isfile(os.path.join(model_dir, item.model_file)):
+        return False
+    if item.hash_val is None:
+        return True
+    if not os.path.isfile(hash_file):
+        return False
+    with open(hash_file) as f:
+        return f.read().strip() == item.hash_val
+
+
+def _download_ranges(url: str, filepath: str, progress: bool = True, chunk_size: int = 1 << 20) -> bool:
+    """
+    Download `url` to `filepath` by concurrent HTTP range requests.
+    Returns: whether the file is downloaded. False if the server does not support range requests,
+    the file is too small to be split, or any of the requests failed.
+    """
+    errors = (OSError, ValueError, http.client.HTTPException)  # `URLError` is a subclass of `OSError`
+    try:
+        # probe by a one-byte range request instead of "HEAD", which is turned into "GET" by the redirections,
+        # a partial content response "Content-Range: bytes 0-0/<size>" indicates that ranges are supported
+        with urlopen(Request(url, headers={"Range": "bytes=0-0"}), timeout=RANGE_TIMEOUT) as resp:
+            url = resp.geturl()  # the redirected location
+            if resp.getcode() != 206:
+                return False
+            size = int(resp.headers.get("Content-Range", "").rpartition("/")[2])
+    except errors:  # including an unknown size "*"
+        return False
+    num_parts = min(RANGE_MAX_WORKERS, -(-size // RANGE_PART_BYTES))
+    if num_parts < 2:
+        return False
+    part_size = -(-size // num_parts)
+    tmp_name = f"{filepath}.part"
+    file_dir = os.path.dirname(filepath)
+    if file_dir:
+        os.makedirs(file_dir, exist_ok=True)
+    with open(tmp_name, "wb") as f:
+        f.truncate(size)
+
+    pbar = None
+    if progress and has_tqdm:
+        pbar = tqdm(total=size, unit="B", unit_scale=True, unit_divisor=1024, desc=os.path.basename(filepath))
+    elif progress:
+        warnings.warn("tqdm is not installed, will not show the downloading progress bar.")
+    lock = threading.Lock()
+
+    def _fetch(start: int):
+        end = min(start + part_size, size) - 1
+        req = Request(url, headers={"Range": f"bytes={start}-{end}"})
+        with urlopen(req, timeout=RANGE_TIMEOUT) as resp, open(tmp_name, "r+b") as f:
+            if resp.getcode() != 206:
+                raise ValueError(f"Range request is not supported by {url}.")
+            f.seek(start)
+            for block in iter(lambda: resp.read(chunk_size), b""):
+                f.write(block)
+                if pbar is not None:
+                    with lock:
+                        pbar.update(len(block))
+            if f.tell() != end + 1:
+                msg = f"Incomplete range {start}-{end} downloaded from {url}."
+                raise ContentTooShortError(msg, (tmp_name, resp.headers))
+
+    print(f"Downloading {filepath} by {num_parts} concurrent requests.")
+    try:
+        with ThreadPoolExecutor(max_workers=num_parts) as executor:
+            list(executor.map(_fetch, range(0, size, part_size)))
+    except errors as e:
+        print(f"Concurrent download failed: {e}")
+        os.remove(tmp_name)
+        return False
+    finally:
+        if pbar is not None:
+            pbar.close()
+    os.replace(tmp_name, filepath)
+    return True
+
+
+def download_mmar(item, mmar_dir=None, progress: bool = True, force: bool = False, chunk_size: int = 1 << 20):
     """
     Download and extract Medical Model Archive (MMAR) from Nvidia Clara Train.
 
@@ -56,9 +200,12 @@ def download_mmar(item, mmar_dir=None, progress: bool = True):
         - https://docs.nvidia.com/clara/clara-train-sdk/pt/mmar.html
 
     Args:
-        item: the corresponding model item from `MODEL_DESC`.
+        item: the corresponding model item from `MODEL_DESC`, its index in `MODEL_DESC`, or its model ID.
         mmar_dir: target directory to store the MMAR, default is mmars subfolder under `torch.hub get_dir()`.
         progress: whether to display a progress bar.
+        force: whether to verify and extract the archive again even if the MMAR is already available in `mmar_dir`,
+            the existing MMAR folder is removed before the extraction.
+        chunk_size: the number of bytes of each block read from the network, defaults to 1 MiB.
 
     Examples::
         >>> from monai.apps import download_mmar
@@ -67,26 +214,38 @@ def download_mmar(item, mmar_dir=None, progress: bool = True):
     Returns:
         The local directory of the downloaded model.
     """
-    if not isinstance(item, Mapping):
-        item = _get_model_spec(item)
+    item = _get_model_spec(item)
     if not mmar_dir:
-        get_dir, has_home = optional_import("torch.hub", name="get_dir")
         if has_home:
             mmar_dir = os.path.join(get_dir(), "mmars")
         else:
             raise ValueError("mmar_dir=None, but no suitable default directory computed. Upgrade Pytorch to 1.6+ ?")
 
-    model_dir = os.path.join(mmar_dir, item[Keys.ID])
+    model_dir = os.path.join(mmar_dir, item.id)
+    filepath = os.path.join(mmar_dir, f"{item.id}.{item.file_type}")
+    hash_file = f"{filepath}.{item.hash_type}"
+    if not force and _is_extracted(item, model_dir, hash_file):
+        print(f"MMAR exists: {model_dir}, skipped downloading.")
+        return model_dir
+    if force and os.path.isdir(model_dir):
+        shutil.rmtree(model_dir)  # `download_and_extract` skips the extraction into a non-empty folder
+    if not os.path.exists(filepath) and item.url.startswith(("http://", "https://")):
+        # `download_and_extract` downloads the archive if not downloaded here
+        _download_ranges(item.url, filepath, progress=progress, chunk_size=chunk_size)
     download_and_extract(
-        url=item[Keys.URL],
-        filepath=os.path.join(mmar_dir, f"{item[Keys.ID]}.{item[Keys.FILE_TYPE]}"),
+        url=item.url,
+        filepath=filepath,
         output_dir=model_dir,
-        hash_val=item[Keys.HASH_VAL],
-        hash_type=item[Keys.HASH_TYPE],
-        file_type=item[Keys.FILE_TYPE],
+        hash_val=item.hash_val,
+        hash_type=item.hash_type,
+        file_type=item.file_type,
         has_base=False,
         progress=progress,
+        chunk_size=chunk_size,
     )
+    if item.hash_val is not None:
+        with open(hash_file, "w") as f:
+            f.write(item.hash_val)  # record the verified hash value for the repeated calls
     return model_dir
 
 
@@ -98,20 +257,44 @@ def load_from_mmar(
     pretrained=True,
     weights_only=False,
     model_key: str = "model",
+    mmap: bool = True,
+    use_cache: bool = False,
+    flat_cache: bool = False,
+    force: bool = False,
 ):
     """
     Download and extract Medical Model Archive (MMAR) model weights from Nvidia Clara Train.
 
     Args:
-        item: the corresponding model item from `MODEL_DESC`.
+        item: the corresponding model item from `MODEL_DESC`, its index in `MODEL_DESC`, or its model ID.
         mmar_dir: : target directory to store the MMAR, default is mmars subfolder under `torch.hub get_dir()`.
         progress: whether to display a progress bar when downloading the content.
         map_location: pytorch API parameter for `torch.load` or `torch.jit.load`.
         pretrained: whether to load the pretrained weights after initializing a network module.
         weights_only: whether to load only the weights instead of initializing the network module and assign weights.
+            With PyTorch 1.13+, this flag is forwarded to `torch.load`, if the model file can not be loaded by
+            `torch.load(..., weights_only=True)`, a warning is issued and it is loaded with `weights_only=False`.
         model_key: a key to search in the model file or config file for the model dictionary.
             Currently this function assumes that the model dictionary has
             `{"[name|path]": "test.module", "args": {'kw': 'test'}}`.
+        mmap: whether to memory-map the tensor storages of the model file instead of reading them into memory.
+            If the pretrained weights have the same dtypes and devices as the parameters and buffers of the network
+            module, they are assigned to the module without copying, so that the module's tensors are backed by
+            a private (copy-on-write) mapping of the model file. Otherwise the weights are copied as usual.
+            This option requires PyTorch 2.1+ and is ignored otherwise.
+        use_cache: whether to keep the loaded object in memory and return it in the repeated calls with the same
+            `item`, `map_location`, `pretrained`, `weights_only` and `model_key`. The weights dictionary is
+            returned as a shallow copy, while the network module is shared by the callers, so that modifying the
+            returned module affects the following calls. Use `load_from_mmar.cache_clear()` to release the cache.
+        flat_cache: whether to convert the weights of the model file into a flat binary file with a JSON index
+            (`model_file.bin` and `model_file.index.json`) on the first load, and to memory-map the weights
+            from these files in the following calls instead of unpickling the model file.
+            The conversion is skipped if the weights are not all tensors of numpy-compatible dtypes, or the
+            `train_conf` of the model file is changed by the JSON serialization. This option is ignored if
+            `map_location` is a dict or a callable.
+            Note that this stores a second copy of the weights in the MMAR folder, i.e. doubles its disk usage.
+        force: whether to verify and extract the archive again even if the MMAR is already available in `mmar_dir`,
+            for example, to recover from an incomplete extraction. See also: `download_mmar`.
 
     Examples::
         >>> from monai.apps import load_from_mmar
@@ -121,48 +304,91 @@ def load_from_mmar(
     See Also:
         https://docs.nvidia.com/clara/
     """
-    if not isinstance(item, Mapping):
-        item = _get_model_spec(item)
-    model_dir = download_mmar(item=item, mmar_dir=mmar_dir, progress=progress)
-    model_file = os.path.join(model_dir, item[Keys.MODEL_FILE])
-    print(f'\n*** "{item[Keys.ID]}" available at {model_dir}.')
+    item = _get_model_spec(item)
+    cache_key: Optional[Tuple] = (item, str(map_location), bool(pretrained), bool(weights_only), model_key)
+    if use_cache and cache_key in _LOAD_CACHE:
+        print(f'\n*** "{item.id}" loaded from cache.')
+        return _cached(None, _LOAD_CACHE[cache_key])
+    if not use_cache:
+        cache_key = None
+    model_dir = download_mmar(item=item, mmar_dir=mmar_dir, progress=progress, force=force)
+    model_file = os.path.join(model_dir, item.model_file)
+    print(f'\n*** "{item.id}" available at {model_dir}.')
 
     # loading with `torch.jit.load`
-    if f"{model_file}".endswith(".ts"):
+    if model_file.endswith(".ts"):
         if not pretrained:
             warnings.warn("Loading a ScriptModule, 'pretrained' option ignored.")
         if weights_only:
             warnings.warn("Loading a ScriptModule, 'weights_only' option ignored.")
-        return torch.jit.load(model_file, map_location=map_location)
+        return _cached(cache_key, torch.jit.load(_preload(model_file), map_location=map_location))
 
-    # loading with `torch.load`
-    model_dict = torch.load(model_file, map_location=map_location)
+    model_dict, source = None, None
+    use_flat = flat_cache and (map_location is None or isinstance(map_location, (str, torch.device)))
+    if use_flat:
+        model_dict = _load_flat(model_file, map_location=map_location)
+    if model_dict is None:
+        mmap = mmap and has_option(torch.load, "mmap") and _is_zip_format(model_file)
+        # unless memory-mapped, the model file is read by `_READ_POOL` while the config file is parsed below
+        source = model_file if mmap else _READ_POOL.submit(_preload, model_file)
+
+    json_path = os.path.join(model_dir, item.config_file or "config_train.json")
+    conf_dict = None
+    if isinstance(source, Future) and not weights_only and os.path.isfile(json_path):
+        try:
+            conf_dict = _read_json(json_path)  # only used if `train_conf` has no model config
+        except (OSError, ValueError):
+            pass  # the error is raised below if the config file is required
+        file_config = _get_val(conf_dict or {}, key=model_key, default={})
+        if isinstance(file_config, Mapping) and file_config.get("name"):
+            import monai.networks.nets  # noqa: F401, imported to resolve the network class
+    if model_dict is None:
+        # loading with `torch.load`
+        load_kwargs = {"map_location": map_location}
+        if has_option(torch.load, "weights_only"):
+            # restrict the unpickler to tensors and primitive types only if `weights_only`, the default of
+            # `torch.load` changes to `weights_only=True` since PyTorch 2.6
+            load_kwargs["weights_only"] = bool(weights_only)
+        try:
+            model_dict = _torch_load(source, mmap=mmap, **load_kwargs)
+        except pickle.UnpicklingError:
+            if not load_kwargs.get("weights_only"):
+                raise
+            warnings.warn(f"{model_file} contains objects other than the weights, loading with 'weights_only=False'.")
+            load_kwargs["weights_only"] = False
+            model_dict = _torch_load(source, mmap=mmap, **load_kwargs)
+        if use_flat:  # the flat weights are not available, out of date or incomplete
+            _save_flat(model_file, model_dict, model_key=model_key, map_location=map_location)
     if weights_only:
-        return model_dict.get(model_key, model_dict)  # model_dict[model_key] or model_dict directly
+        # model_dict[model_key] or model_dict directly
+        return _cached(cache_key, model_dict.get(model_key, model_dict))
 
     # 1. search `model_dict['train_config]` for model config spec.
-    model_config = _get_val(dict(model_dict).get("train_conf", {}), key=model_key, default={})
+    train_conf = model_dict.get("train_conf", {}) if isinstance(model_dict, Mapping) else {}
+    model_config = _get_val(train_conf, key=model_key, default={})
     if not model_config:
         # 2. search json CONFIG_FILE for model config spec.
-        json_path = os.path.join(model_dir, item.get(Keys.CONFIG_FILE, "config_train.json"))
-        with open(json_path) as f:
-            conf_dict = json.load(f)
-        conf_dict = dict(conf_dict)
+        if conf_dict is None:
+            conf_dict = _read_json(json_path)
         model_config = _get_val(conf_dict, key=model_key, default={})
-    if not model_config:
+    if not model_config and isinstance(model_dict, Mapping):
         # 3. search `model_dict` for model config spec.
-        model_config = _get_val(dict(model_dict), key=model_key, default={})
+        model_config = _get_val(model_dict, key=model_key, default={})
 
     if not (model_config and isinstance(model_config, Mapping)):
         raise ValueError(
-            f"Could not load model config dictionary from config: {item.get(Keys.CONFIG_FILE)}, "
-            f"or from model file: {item.get(Keys.MODEL_FILE)}."
+            f"Could not load model config dictionary from config: {item.config_file}, "
+            f"or from model file: {item.model_file}."
         )
 
     # parse `model_config` for model class and model parameters
     if model_config.get("name"):  # model config section is a "name"
+        import monai.networks.nets as monai_nets  # only required to instantiate a network
+
         model_name = model_config["name"]
-        model_cls = monai_nets.__dict__[model_name]
+        model_cls = getattr(monai_nets, model_name, None)
+        if model_cls is None:
+            raise ValueError(f"Unknown model name {model_name}, it should be a network class in monai.networks.nets.")
     elif model_config.get("path"):  # model config section is a "path"
         # https://docs.nvidia.com/clara/clara-train-sdk/pt/byom.html
         model_module, model_name = model_config.get("path", ".").rsplit(".", 1)
@@ -184,10 +410,236 @@ def load_from_mmar(
     else:
         model_inst = model_cls()
     if pretrained:
-        model_inst.load_state_dict(model_dict.get(model_key, model_dict))
+        state_dict = model_dict.get(model_key, model_dict)
+        if mmap and _can_assign(model_inst, state_dict):
+            model_inst.load_state_dict(state_dict, assign=True)
+        elif len(state_dict) > PARALLEL_LOAD_MIN_KEYS:
+            _parallel_load_state_dict(model_inst, state_dict)
+        else:
+            model_inst.load_state_dict(state_dict)
     print("\n---")
-    print(f"For more information, please visit {item[Keys.DOC]}\n")
-    return model_inst
+    print(f"For more information, please visit {item.doc}\n")
+    return _cached(cache_key, model_inst)
+
+
+load_from_mmar.cache_clear = _LOAD_CACHE.clear  # type: ignore
+
+
+def _cached(cache_key: Optional[Tuple], obj):
+    """
+    Store `obj` in the loading cache if `cache_key` is not None.
+    Returns a shallow copy of `obj` if it is a mapping, otherwise `obj` itself.
+    """
+    if cache_key is not None:
+        _LOAD_CACHE[cache_key] = obj
+    return copy.copy(obj) if isinstance(obj, Mapping) else obj
+
+
+def _can_assign(model: torch.nn.Module, state_dict: Mapping) -> bool:
+    """
+    Whether `state_dict` can be loaded by `model.load_state_dict(state_dict, assign=True)` without changing
+    the dtypes and devices of the parameters and buffers of `model`.
+    """
+    if not has_option(model.load_state_dict, "assign"):
+        return False
+    targets = model.state_dict()
+    if set(targets) != set(state_dict):
+        return False
+    for name, target in targets.items():
+        val = state_dict[name]
+        if not isinstance(val, torch.Tensor) or val.dtype != target.dtype or val.device != target.device:
+            return False
+    return True
+
+
+def _parallel_load_state_dict(model: torch.nn.Module, state_dict: Mapping, num_threads: int = 8):
+    """
+    Copy `state_dict` into the parameters and buffers of `model` with a thread pool.
+    This function falls back to `model.load_state_dict(state_dict)` if the keys or the shapes of `state_dict`
+    do not exactly match the ones of `model`, or if any submodule customizes the state dict loading
+    (by overriding `_load_from_state_dict` or registering load state dict hooks).
+    """
+    targets = model.state_dict()  # detached tensors sharing the storages of the parameters and buffers
+    mismatched = set(targets) != set(state_dict)
+    if (
+        mismatched
+        or any(targets[k].shape != getattr(state_dict[k], "shape", None) for k in targets)
+        or any(_has_custom_loading(m) for m in model.modules())
+    ):
+        model.load_state_dict(state_dict)  # to handle or report the mismatches
+        return
+
+    def _copy(name: str):
+        targets[name].copy_(state_dict[name])  # the GIL is released during the copy
+
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        list(executor.map(_copy, targets))
+
+
+def _has_custom_loading(module: torch.nn.Module) -> bool:
+    """
+    Whether `module` overrides `_load_from_state_dict` or has load state dict pre/post hooks.
+    The overrides of the normalization layers are not considered, they only fill in or drop the running
+    statistics keys of older checkpoints, which is not required when the keys match exactly.
+    """
+    if type(module)._load_from_state_dict not in _DEFAULT_LOADERS:
+        return True
+    return bool(module._load_state_dict_pre_hooks or getattr(module, "_load_state_dict_post_hooks", None))
+
+
+def _torch_load(source, mmap: bool = False, **kwargs):
+    """
+    Load `source` with `torch.load`. `source` is the model file path if `mmap` is True, so that the tensor
+    storages are memory-mapped. Otherwise it is the future of `_preload(model_file)` submitted to `_READ_POOL`.
+    """
+    if mmap:
+        return torch.load(source, mmap=True, **kwargs)
+    buffer = source.result()
+    if isinstance(buffer, io.BytesIO):
+        buffer.seek(0)  # when loaded again without `weights_only`
+    return torch.load(buffer, **kwargs)
+
+
+def _is_zip_format(model_file: str) -> bool:
+    """
+    Whether `model_file` starts with the zip magic number, i.e. it is saved in the zipfile-based format of
+    `torch.save`, which is required by memory-mapping.
+    """
+    with open(model_file, "rb") as f:
+        return f.read(4) == b"PK\x03\x04"
+
+
+def _save_flat(model_file: str, model_dict, model_key: str = "model", map_location=None) -> bool:
+    """
+    Save the weights of `model_dict` loaded from `model_file` into `model_file.bin`, each tensor is stored
+    at an offset aligned to `FLAT_ALIGN_BYTES`. The tensor offsets, dtypes and shapes are indexed in
+    `model_file.index.json`, together with the `train_conf` of `model_dict` if available.
+    The tensor devices are also indexed if `map_location` is None, i.e. the tensors are on the devices
+    they were saved from.
+    Returns: whether the weights are saved. The weights are not saved if `train_conf` is not preserved by
+    the JSON serialization, for example, it contains tuples or non-string keys.
+    """
+    if not isinstance(model_dict, Mapping):
+        return False
+    has_key = model_key in model_dict
+    state_dict = model_dict[model_key] if has_key else model_dict
+    if not (isinstance(state_dict, Mapping) and all(isinstance(v, torch.Tensor) for v in state_dict.values())):
+        return False
+    index: Dict[str, Any] = {"model_key": model_key if has_key else None, "tensors": {}}
+    stat = os.stat(model_file)
+    index["source"] = [stat.st_size, stat.st_mtime_ns]
+    if has_key and model_dict.get("train_conf") is not None:
+        index["train_conf"] = model_dict["train_conf"]
+    try:
+        arrays = OrderedDict((k, v.detach().cpu().contiguous().numpy()) for k, v in state_dict.items())
+    except (TypeError, RuntimeError):  # tensor dtypes not supported by numpy
+        return False
+    offset = 0
+    for name, arr in arrays.items():
+        device = str(state_dict[name].device) if map_location is None else None
+        index["tensors"][name] = [offset, arr.dtype.str, list(arr.shape), device]
+        offset += -(-arr.nbytes // FLAT_ALIGN_BYTES) * FLAT_ALIGN_BYTES
+    try:
+        index_str = json.dumps(index)
+    except (TypeError, ValueError):  # `train_conf` is not serializable
+        return False
+    if json.loads(index_str).get("train_conf") != index.get("train_conf"):
+        return False
+    # both files are written to unique temporary names and then renamed, the index last, so that
+    # concurrent loading never sees a partially written file
+    tmp_names = []
+    try:
+        fd, tmp_bin = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(model_file))
+        tmp_names.append(tmp_bin)
+        with os.fdopen(fd, "wb") as f:
+            for (start, *_), arr in zip(index["tensors"].values(), arrays.values()):
+                f.seek(start)
+                f.write(arr.tobytes())
+            f.truncate(max(offset, 1))  # an empty file can not be memory-mapped
+        fd, tmp_index = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(model_file))
+        tmp_names.append(tmp_index)
+        with os.fdopen(fd, "w") as f:
+            f.write(index_str)
+        for name in tmp_names:
+            os.chmod(name, stat.st_mode & 0o666)  # `mkstemp` creates files only accessible by the owner
+        os.replace(tmp_bin, f"{model_file}.bin")
+        os.replace(tmp_index, f"{model_file}.index.json")
+    except OSError as e:
+        warnings.warn(f"Could not save the flat weights of {model_file}: {e}")
+        for name in tmp_names:
+            if os.path.exists(name):
+                os.remove(name)
+        return False
+    return True
+
+
+def _load_flat(model_file: str, map_location=None):
+    """
+    Load the weights saved by `_save_flat` by memory-mapping `model_file.bin` in the copy-on-write mode.
+    Returns: the weights dictionary (in the same structure as `model_file`), or None if the flat weights
+    are not available, out of date, unreadable, or `map_location` is None but the tensor devices are not indexed.
+    """
+    index_file = f"{model_file}.index.json"
+    if not os.path.isfile(index_file):
+        return None
+    try:
+        with open(index_file, "rb") as f:
+            index = _json_loads(f.read())
+        stat = os.stat(model_file)
+        if index.get("source") != [stat.st_size, stat.st_mtime_ns]:
+            return None
+        if map_location is None and any(device is None for *_, device in index["tensors"].values()):
+            return None
+        buffer = np.memmap(f"{model_file}.bin", dtype=np.uint8, mode="c")
+        state_dict: Dict[str, torch.Tensor] = OrderedDict()
+        for name, (offset, dtype_str, shape, device) in index["tensors"].items():
+            dtype = np.dtype(dtype_str)
+            nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+            if offset + nbytes > buffer.size:
+                raise ValueError(f"{model_file}.bin is truncated.")
+            tensor = torch.from_numpy(buffer[offset : offset + nbytes].view(dtype).reshape(shape))
+            state_dict[name] = tensor.to(map_location if map_location is not None else device)
+        model_key = index["model_key"]
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        warnings.warn(f"Could not load the flat weights of {model_file}: {e}")
+        return None
+    if model_key is None:
+        return state_dict
+    model_dict: Dict[str, Any] = {model_key: state_dict}
+    if "train_conf" in index:
+        model_dict["train_conf"] = index["train_conf"]
+    return model_dict
+
+
+def _preload(model_file: str):
+    """
+    Read `model_file` into an in-memory buffer, so that `torch.load` and `torch.jit.load` parse it without
+    issuing many small reads on the file handle. Files larger than `PRELOAD_MAX_BYTES` are left to be
+    loaded from the path directly.
+    """
+    if os.path.getsize(model_file) > PRELOAD_MAX_BYTES:
+        return model_file
+    with open(model_file, "rb") as f:
+        return io.BytesIO(f.read())
+
+
+def _read_json(json_path: str):
+    """read and parse the JSON file `json_path`."""
+    with open(json_path, "rb") as f:
+        return _json_loads(f.read())
+
+
+def _json_loads(data: bytes):
+    """
+    Parse the JSON `data` with `orjson` if available, otherwise or if `orjson` rejects it
+    (for example, `NaN`, `Infinity` or integers wider than 64 bits), with `json`.
+    """
+    if has_orjson:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
 
 
 def _get_val(input_dict: Mapping, key="model", default=None):
@@ -197,10 +649,11 @@ def _get_val(input_dict: Mapping, key="model", default=None):
     """
     if key in input_dict:
         return input_dict[key]
-    for sub_dict in input_dict:
-        val = input_dict[sub_dict]
-        if isinstance(val, Mapping):
-            found_val = _get_val(val, key=key, default=None)
-            if found_val is not None:
-                return found_val
+    queue = deque(val for val in input_dict.values() if isinstance(val, Mapping))
+    while queue:
+        sub_dict = queue.popleft()
+        found_val = sub_dict.get(key)
+        if found_val is not None:
+            return found_val
+        queue.extend(val for val in sub_dict.values() if isinstance(val, Mapping))
     return default
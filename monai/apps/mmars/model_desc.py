@@ -17,8 +17,9 @@ See Also:
 """
 
 import os
+from typing import Any, NamedTuple, Optional, Tuple, Union
 
-__all__ = ["MODEL_DESC", "RemoteMMARKeys"]
+__all__ = ["MODEL_DESC", "MMARSpec", "RemoteMMARKeys"]
 
 
 class RemoteMMARKeys:
@@ -38,95 +39,145 @@ class RemoteMMARKeys:
     CONFIG_FILE = "config_file"  # within an MMAR folder, the relative path to the config file (for model config)
 
 
+class MMARSpec(NamedTuple):
+    """
+    Specification of a remote MMAR, the field names are the values of `RemoteMMARKeys`.
+    For backward compatibility, the fields can also be accessed by the dictionary methods with the field names
+    as the keys: `spec[RemoteMMARKeys.ID]`, `RemoteMMARKeys.ID in spec`, `spec.get()`, `spec.keys()`,
+    `spec.values()`, `spec.items()` and `dict(spec)`. The optional fields which are None, such as an unspecified
+    `config_file`, are not keys, so that `dict(spec)` is the same as the original dictionary description.
+    Note that `MMARSpec` is a tuple but not a `Mapping`: iterating over it and `len()` follow the tuple semantics,
+    i.e. iterating yields the values, and positional indices are also supported by `spec[index]`.
+    """
+
+    id: str  # unique MMAR
+    name: str  # MMAR name for readability
+    url: str  # remote location of the MMAR
+    doc: str  # documentation page of the remote model
+    file_type: str  # type of the compressed MMAR
+    hash_type: str  # hashing method for the compressed MMAR
+    hash_val: Optional[str]  # hashing value for the compressed MMAR
+    model_file: str  # within an MMAR folder, the relative path to the model file
+    config_file: Optional[str] = None  # within an MMAR folder, the relative path to the config file
+
+    def __getitem__(self, key: Union[str, int, slice]) -> Any:  # type: ignore
+        if isinstance(key, str):
+            if key not in self:
+                raise KeyError(key)
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, str) or key not in self._fields:
+            return False
+        return key not in self._field_defaults or getattr(self, key) is not None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """return the value of `key` if `key` is in the spec, else `default`."""
+        return getattr(self, key) if key in self else default
+
+    def keys(self) -> Tuple[str, ...]:
+        """return the field names, except the optional fields which are None."""
+        return tuple(key for key in self._fields if key in self)
+
+    def values(self) -> Tuple[Any, ...]:
+        """return the values of `keys()`."""
+        return tuple(getattr(self, key) for key in self.keys())
+
+    def items(self) -> Tuple[Tuple[str, Any], ...]:
+        """return the `(key, value)` pairs of `keys()`."""
+        return tuple((key, getattr(self, key)) for key in self.keys())
+
+
 MODEL_DESC = (
-    {
-        RemoteMMARKeys.ID: "clara_pt_prostate_mri_segmentation_1",
-        RemoteMMARKeys.NAME: "clara_pt_prostate_mri_segmentation",
-        RemoteMMARKeys.URL: "https://api.ngc.nvidia.com/v2/models/nvidia/"
+    MMARSpec(
+        id="clara_pt_prostate_mri_segmentation_1",
+        name="clara_pt_prostate_mri_segmentation",
+        url="https://api.ngc.nvidia.com/v2/models/nvidia/"
         "med/clara_pt_prostate_mri_segmentation/versions/1/zip",
-        RemoteMMARKeys.DOC: "https://ngc.nvidia.com/catalog/models/nvidia:med:clara_pt_prostate_mri_segmentation",
-        RemoteMMARKeys.FILE_TYPE: "zip",
-        RemoteMMARKeys.HASH_TYPE: "md5",
-        RemoteMMARKeys.HASH_VAL: None,
-        RemoteMMARKeys.MODEL_FILE: os.path.join("models", "model.pt"),
-    },
-    {
-        RemoteMMARKeys.ID: "clara_pt_covid19_ct_lesion_segmentation_1",
-        RemoteMMARKeys.NAME: "clara_pt_covid19_ct_lesion_segmentation",
-        RemoteMMARKeys.URL: "https://api.ngc.nvidia.com/v2/models/nvidia/"
+        doc="https://ngc.nvidia.com/catalog/models/nvidia:med:clara_pt_prostate_mri_segmentation",
+        file_type="zip",
+        hash_type="md5",
+        hash_val=None,
+        model_file=os.path.join("models", "model.pt"),
+    ),
+    MMARSpec(
+        id="clara_pt_covid19_ct_lesion_segmentation_1",
+        name="clara_pt_covid19_ct_lesion_segmentation",
+        url="https://api.ngc.nvidia.com/v2/models/nvidia/"
         "med/clara_pt_covid19_ct_lesion_segmentation/versions/1/zip",
-        RemoteMMARKeys.DOC: "https://ngc.nvidia.com/catalog/models/nvidia:med:clara_pt_covid19_ct_lesion_segmentation",
-        RemoteMMARKeys.FILE_TYPE: "zip",
-        RemoteMMARKeys.HASH_TYPE: "md5",
-        RemoteMMARKeys.HASH_VAL: None,
-        RemoteMMARKeys.MODEL_FILE: os.path.join("models", "model.pt"),
-    },
-    {
-        RemoteMMARKeys.ID: "clara_pt_fed_learning_brain_tumor_mri_segmentation_1",
-        RemoteMMARKeys.NAME: "clara_pt_fed_learning_brain_tumor_mri_segmentation",
-        RemoteMMARKeys.URL: "https://api.ngc.nvidia.com/v2/models/nvidia/"
+        doc="https://ngc.nvidia.com/catalog/models/nvidia:med:clara_pt_covid19_ct_lesion_segmentation",
+        file_type="zip",
+        hash_type="md5",
+        hash_val=None,
+        model_file=os.path.join("models", "model.pt"),
+    ),
+    MMARSpec(
+        id="clara_pt_fed_learning_brain_tumor_mri_segmentation_1",
+        name="clara_pt_fed_learning_brain_tumor_mri_segmentation",
+        url="https://api.ngc.nvidia.com/v2/models/nvidia/"
         "med/clara_pt_fed_learning_brain_tumor_mri_segmentation/versions/1/zip",
-        RemoteMMARKeys.DOC: "https://ngc.nvidia.com/catalog/models/"
+        doc="https://ngc.nvidia.com/catalog/models/"
         "nvidia:med:clara_pt_fed_learning_brain_tumor_mri_segmentation",
-        RemoteMMARKeys.FILE_TYPE: "zip",
-        RemoteMMARKeys.HASH_TYPE: "md5",
-        RemoteMMARKeys.HASH_VAL: None,
-        RemoteMMARKeys.MODEL_FILE: os.path.join("models", "server", "best_FL_global_model.pt"),
-    },
-    {
-        RemoteMMARKeys.ID: "clara_pt_pathology_metastasis_detection_1",
-        RemoteMMARKeys.NAME: "clara_pt_pathology_metastasis_detection",
-        RemoteMMARKeys.URL: "https://api.ngc.nvidia.com/v2/models/nvidia/"
+        file_type="zip",
+        hash_type="md5",
+        hash_val=None,
+        model_file=os.path.join("models", "server", "best_FL_global_model.pt"),
+    ),
+    MMARSpec(
+        id="clara_pt_pathology_metastasis_detection_1",
+        name="clara_pt_pathology_metastasis_detection",
+        url="https://api.ngc.nvidia.com/v2/models/nvidia/"
         "med/clara_pt_pathology_metastasis_detection/versions/1/zip",
-        RemoteMMARKeys.DOC: "https://ngc.nvidia.com/catalog/models/nvidia:med:clara_pt_pathology_metastasis_detection",
-        RemoteMMARKeys.FILE_TYPE: "zip",
-        RemoteMMARKeys.HASH_TYPE: "md5",
-        RemoteMMARKeys.HASH_VAL: None,
-        RemoteMMARKeys.MODEL_FILE: os.path.join("models", "model.pt"),
-        RemoteMMARKeys.CONFIG_FILE: os.path.join("config", "config_train.json"),
-    },
-    {
-        RemoteMMARKeys.ID: "clara_pt_brain_mri_segmentation_1",
-        RemoteMMARKeys.NAME: "clara_pt_brain_mri_segmentation",
-        RemoteMMARKeys.URL: "https://api.ngc.nvidia.com/v2/models/nvidia/med/clara_pt_brain_mri_segmentation/versions/1/zip",
-        RemoteMMARKeys.DOC: "https://ngc.nvidia.com/catalog/models/nvidia:med:clara_pt_brain_mri_segmentation",
-        RemoteMMARKeys.FILE_TYPE: "zip",
-        RemoteMMARKeys.HASH_TYPE: "md5",
-        RemoteMMARKeys.HASH_VAL: None,
-        RemoteMMARKeys.MODEL_FILE: os.path.join("models", "model.pt"),
-    },
-    {
-        RemoteMMARKeys.ID: "clara_pt_brain_mri_segmentation_t1c_1",
-        RemoteMMARKeys.NAME: "clara_pt_brain_mri_segmentation_t1c",
-        RemoteMMARKeys.URL: "https://api.ngc.nvidia.com/v2/models/nvidia/med/clara_pt_brain_mri_segmentation_t1c/versions/1/zip",
-        RemoteMMARKeys.DOC: "https://ngc.nvidia.com/catalog/models/nvidia:med:clara_pt_brain_mri_segmentation_t1c",
-        RemoteMMARKeys.FILE_TYPE: "zip",
-        RemoteMMARKeys.HASH_TYPE: "md5",
-        RemoteMMARKeys.HASH_VAL: None,
-        RemoteMMARKeys.MODEL_FILE: os.path.join("models", "model.pt"),
-    },
-    {
-        RemoteMMARKeys.ID: "clara_pt_liver_and_tumor_ct_segmentation_1",
-        RemoteMMARKeys.NAME: "clara_pt_liver_and_tumor_ct_segmentation",
-        RemoteMMARKeys.URL: "https://api.ngc.nvidia.com/v2/models/nvidia/"
+        doc="https://ngc.nvidia.com/catalog/models/nvidia:med:clara_pt_pathology_metastasis_detection",
+        file_type="zip",
+        hash_type="md5",
+        hash_val=None,
+        model_file=os.path.join("models", "model.pt"),
+        config_file=os.path.join("config", "config_train.json"),
+    ),
+    MMARSpec(
+        id="clara_pt_brain_mri_segmentation_1",
+        name="clara_pt_brain_mri_segmentation",
+        url="https://api.ngc.nvidia.com/v2/models/nvidia/med/clara_pt_brain_mri_segmentation/versions/1/zip",
+        doc="https://ngc.nvidia.com/catalog/models/nvidia:med:clara_pt_brain_mri_segmentation",
+        file_type="zip",
+        hash_type="md5",
+        hash_val=None,
+        model_file=os.path.join("models", "model.pt"),
+    ),
+    MMARSpec(
+        id="clara_pt_brain_mri_segmentation_t1c_1",
+        name="clara_pt_brain_mri_segmentation_t1c",
+        url="https://api.ngc.nvidia.com/v2/models/nvidia/med/clara_pt_brain_mri_segmentation_t1c/versions/1/zip",
+        doc="https://ngc.nvidia.com/catalog/models/nvidia:med:clara_pt_brain_mri_segmentation_t1c",
+        file_type="zip",
+        hash_type="md5",
+        hash_val=None,
+        model_file=os.path.join("models", "model.pt"),
+    ),
+    MMARSpec(
+        id="clara_pt_liver_and_tumor_ct_segmentation_1",
+        name="clara_pt_liver_and_tumor_ct_segmentation",
+        url="https://api.ngc.nvidia.com/v2/models/nvidia/"
         "med/clara_pt_liver_and_tumor_ct_segmentation/versions/1/zip",
-        RemoteMMARKeys.DOC: "https://ngc.nvidia.com/catalog/models/nvidia:med:clara_pt_liver_and_tumor_ct_segmentation",
-        RemoteMMARKeys.FILE_TYPE: "zip",
-        RemoteMMARKeys.HASH_TYPE: "md5",
-        RemoteMMARKeys.HASH_VAL: None,
-        RemoteMMARKeys.MODEL_FILE: os.path.join("models", "model.pt"),
-        RemoteMMARKeys.CONFIG_FILE: os.path.join("config", "config_train.json"),
-    },
-    {
-        RemoteMMARKeys.ID: "clara_pt_pancreas_and_tumor_ct_segmentation_1",
-        RemoteMMARKeys.NAME: "clara_pt_pancreas_and_tumor_ct_segmentation",
-        RemoteMMARKeys.URL: "https://api.ngc.nvidia.com/v2/models/nvidia/"
+        doc="https://ngc.nvidia.com/catalog/models/nvidia:med:clara_pt_liver_and_tumor_ct_segmentation",
+        file_type="zip",
+        hash_type="md5",
+        hash_val=None,
+        model_file=os.path.join("models", "model.pt"),
+        config_file=os.path.join("config", "config_train.json"),
+    ),
+    MMARSpec(
+        id="clara_pt_pancreas_and_tumor_ct_segmentation_1",
+        name="clara_pt_pancreas_and_tumor_ct_segmentation",
+        url="https://api.ngc.nvidia.com/v2/models/nvidia/"
         "med/clara_pt_pancreas_and_tumor_ct_segmentation/versions/1/zip",
-        RemoteMMARKeys.DOC: "https://ngc.nvidia.com/catalog/models/nvidia:med:clara_pt_pancreas_and_tumor_ct_segmentation",
-        RemoteMMARKeys.FILE_TYPE: "zip",
-        RemoteMMARKeys.HASH_TYPE: "md5",
-        RemoteMMARKeys.HASH_VAL: None,
-        RemoteMMARKeys.MODEL_FILE: os.path.join("models", "model.pt"),
-        RemoteMMARKeys.CONFIG_FILE: os.path.join("config", "config_train.json"),
-    },
+        doc="https://ngc.nvidia.com/catalog/models/nvidia:med:clara_pt_pancreas_and_tumor_ct_segmentation",
+        file_type="zip",
+        hash_type="md5",
+        hash_val=None,
+        model_file=os.path.join("models", "model.pt"),
+        config_file=os.path.join("config", "config_train.json"),
+    ),
 )
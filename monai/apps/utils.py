@@ -18,12 +18,15 @@ import warnings
 import zipfile
 from typing import TYPE_CHECKING, Optional
 from urllib.error import ContentTooShortError, HTTPError, URLError
-from urllib.request import urlretrieve
+from urllib.request import urlopen
 
 from monai.utils import min_version, optional_import
 
 gdown, has_gdown = optional_import("gdown", "3.6")
 
+# `hashlib.file_digest` is available since Python 3.11
+_file_digest = getattr(hashlib, "file_digest", None)
+
 if TYPE_CHECKING:
     from tqdm import tqdm
 
@@ -45,7 +48,27 @@ def _basename(p):
     return os.path.basename(p.rstrip(sep))
 
 
-def _download_with_progress(url, filepath, progress: bool = True):
+def _urlretrieve(url, filepath, reporthook=None, chunk_size: int = 1 << 20):
+    """
+    Similar to `urllib.request.urlretrieve`, but copies the content in blocks of `chunk_size` bytes,
+    and calls `reporthook(num_bytes, 1, total_size)` with the number of bytes retrieved so far.
+    """
+    with urlopen(url) as resp, open(filepath, "wb") as f:
+        total_size = int(resp.headers.get("Content-Length", -1))
+        num_bytes = 0
+        if reporthook is not None:
+            reporthook(num_bytes, 1, total_size)
+        for block in iter(lambda: resp.read(chunk_size), b""):
+            f.write(block)
+            num_bytes += len(block)
+            if reporthook is not None:
+                reporthook(num_bytes, 1, total_size)
+    if num_bytes < total_size:
+        msg = f"retrieval incomplete: got only {num_bytes} out of {total_size} bytes"
+        raise ContentTooShortError(msg, (filepath, resp.headers))
+
+
+def _download_with_progress(url, filepath, progress: bool = True, chunk_size: int = 1 << 20):
     """
     Retrieve file from `url` to `filepath`, optionally showing a progress bar.
     """
@@ -76,11 +99,11 @@ def _download_with_progress(url, filepath, progress: bool = True):
                 miniters=1,
                 desc=_basename(filepath),
             ) as t:
-                urlretrieve(url, filepath, reporthook=t.update_to)
+                _urlretrieve(url, filepath, reporthook=t.update_to, chunk_size=chunk_size)
         else:
             if not has_tqdm and progress:
                 warnings.warn("tqdm is not installed, will not show the downloading progress bar.")
-            urlretrieve(url, filepath)
+            _urlretrieve(url, filepath, chunk_size=chunk_size)
     except (URLError, HTTPError, ContentTooShortError, IOError) as e:
         print(f"Download failed from {url} to {filepath}.")
         raise e
@@ -107,8 +130,11 @@ def check_hash(filepath: str, val: Optional[str] = None, hash_type: str = "md5")
         raise NotImplementedError(f"Unknown 'hash_type' {hash_type}.")
     try:
         with open(filepath, "rb") as f:
-            for chunk in iter(lambda: f.read(1024 * 1024), b""):
-                actual_hash.update(chunk)
+            if _file_digest is not None:
+                actual_hash = _file_digest(f, lambda: actual_hash)
+            else:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    actual_hash.update(chunk)
     except Exception as e:
         print(f"Exception in check_hash: {e}")
         return False
@@ -121,7 +147,12 @@ def check_hash(filepath: str, val: Optional[str] = None, hash_type: str = "md5")
 
 
 def download_url(
-    url: str, filepath: str = "", hash_val: Optional[str] = None, hash_type: str = "md5", progress: bool = True
+    url: str,
+    filepath: str = "",
+    hash_val: Optional[str] = None,
+    hash_type: str = "md5",
+    progress: bool = True,
+    chunk_size: int = 1 << 20,
 ) -> None:
     """
     Download file from specified URL link, support process bar and hash check.
@@ -133,15 +164,16 @@ def download_url(
             if None, skip hash validation.
         hash_type: 'md5' or 'sha1', defaults to 'md5'.
         progress: whether to display a progress bar.
+        chunk_size: the number of bytes of each block read from the network, defaults to 1 MiB.
 
     Raises:
         RuntimeError: When the hash validation of the ``filepath`` existing file fails.
         RuntimeError: When a network issue or denied permission prevents the
             file download from ``url`` to ``filepath``.
-        URLError: See urllib.request.urlretrieve.
-        HTTPError: See urllib.request.urlretrieve.
-        ContentTooShortError: See urllib.request.urlretrieve.
-        IOError: See urllib.request.urlretrieve.
+        URLError: See urllib.request.urlopen.
+        HTTPError: See urllib.request.urlopen.
+        ContentTooShortError: When the downloaded content is shorter than the expected length.
+        IOError: See urllib.request.urlopen.
         RuntimeError: When the hash validation of the ``url`` downloaded file fails.
 
     """
@@ -163,7 +195,7 @@ def download_url(
                 raise RuntimeError("To download files from Google Drive, please install the gdown dependency.")
             gdown.download(url, tmp_name, quiet=not progress)
         else:
-            _download_with_progress(url, tmp_name, progress=progress)
+            _download_with_progress(url, tmp_name, progress=progress, chunk_size=chunk_size)
         if not os.path.exists(tmp_name):
             raise RuntimeError(
                 f"Download of file from {url} to {filepath} failed due to network issue or denied permission."
@@ -247,6 +279,7 @@ def download_and_extract(
     file_type: str = "",
     has_base: bool = True,
     progress: bool = True,
+    chunk_size: int = 1 << 20,
 ) -> None:
     """
     Download file from URL and extract it to the output directory.
@@ -266,8 +299,16 @@ def download_and_extract(
             to folder structure `A/*.png`, this flag should be True; if B.zip is unzipped to `*.png`, this flag should
             be False.
         progress: whether to display progress bar.
+        chunk_size: the number of bytes of each block read from the network, defaults to 1 MiB.
     """
     with tempfile.TemporaryDirectory() as tmp_dir:
         filename = filepath or os.path.join(tmp_dir, f"{_basename(url)}")
-        download_url(url=url, filepath=filename, hash_val=hash_val, hash_type=hash_type, progress=progress)
+        download_url(
+            url=url,
+            filepath=filename,
+            hash_val=hash_val,
+            hash_type=hash_type,
+            progress=progress,
+            chunk_size=chunk_size,
+        )
         extractall(filepath=filename, output_dir=output_dir, file_type=file_type, has_base=has_base)
@@ -80,6 +80,7 @@ def get_optional_config_values():
     output["lmdb"] = get_package_version("lmdb")
     output["psutil"] = psutil_version
     output["pandas"] = get_package_version("pandas")
+    output["orjson"] = get_package_version("orjson")
 
     return output
 
@@ -9,9 +9,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
 import os
 import tempfile
 import unittest
+from unittest import mock
 
 import numpy as np
 from parameterized import parameterized
@@ -40,6 +42,20 @@ class TestCheckMD5(unittest.TestCase):
             result = check_hash(filename, md5_value, hash_type=t)
             self.assertTrue(result == expected_result)
 
+    @parameterized.expand([["md5"], ["sha1"]])
+    def test_file_digest(self, hash_type):
+        with tempfile.TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, "test_file.bin")
+            content = os.urandom(3 * 1024 * 1024 + 1)  # more than one read buffer
+            with open(filename, "wb") as f:
+                f.write(content)
+            expected = hashlib.new(hash_type, content).hexdigest()
+            if hasattr(hashlib, "file_digest"):
+                self.assertTrue(check_hash(filename, expected, hash_type=hash_type))
+            with mock.patch("monai.apps.utils._file_digest", None):  # the fallback of the chunked reads
+                self.assertTrue(check_hash(filename, expected, hash_type=hash_type))
+                self.assertFalse(check_hash(filename, "0" * len(expected), hash_type=hash_type))
+
     def test_hash_type_error(self):
         with self.assertRaises(NotImplementedError):
             with tempfile.TemporaryDirectory() as tempdir:
@@ -9,18 +9,34 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import argparse
+import hashlib
+import http.client
+import io
+import json
 import os
+import shutil
 import tempfile
 import unittest
+from pathlib import Path
+from unittest import mock
 from urllib.error import ContentTooShortError, HTTPError
 
 import numpy as np
 import torch
 from parameterized import parameterized
 
-from monai.apps import download_mmar, load_from_mmar
-from monai.apps.mmars import MODEL_DESC
-from monai.apps.mmars.mmars import _get_val
+from monai.apps import download_and_extract, download_mmar, load_from_mmar
+from monai.apps.mmars import MODEL_DESC, MMARSpec, RemoteMMARKeys
+from monai.apps.mmars.mmars import (
+    _READ_POOL,
+    _download_ranges,
+    _get_model_spec,
+    _get_val,
+    _parallel_load_state_dict,
+    has_orjson,
+)
+from monai.utils.module import has_option
 from tests.utils import SkipIfAtLeastPyTorchVersion, SkipIfBeforePyTorchVersion, skip_if_quick
 
 TEST_CASES = [["clara_pt_prostate_mri_segmentation_1"], ["clara_pt_covid19_ct_lesion_segmentation_1"]]
@@ -100,6 +116,72 @@ TEST_EXTRACT_CASES = [
 ]
 
 
+LINEAR_CONF = {"train": {"model": {"path": "torch.nn.Linear", "args": {"in_features": 2, "out_features": 3}}}}
+
+
+def _create_local_mmar(root_dir, model_dict=None, config=None):
+    """
+    create a minimal MMAR archive in `root_dir` and return its model item.
+    `model_dict` is saved as the model file, default to the weights of a `torch.nn.Linear(2, 3)` with `LINEAR_CONF`.
+    `config` is saved as `config_train.json` if specified.
+    """
+    if model_dict is None:
+        model_dict = {"model": torch.nn.Linear(2, 3).state_dict(), "train_conf": LINEAR_CONF}
+    src_dir = os.path.join(root_dir, "src")
+    os.makedirs(os.path.join(src_dir, "models"))
+    torch.save(model_dict, os.path.join(src_dir, "models", "model.pt"))
+    if config is not None:
+        with open(os.path.join(src_dir, "config_train.json"), "w") as f:
+            json.dump(config, f)
+    archive = shutil.make_archive(os.path.join(root_dir, "local_mmar_1"), "zip", src_dir)
+    return {
+        RemoteMMARKeys.ID: "local_mmar_1",
+        RemoteMMARKeys.NAME: "local_mmar",
+        RemoteMMARKeys.URL: Path(archive).as_uri(),
+        RemoteMMARKeys.DOC: archive,
+        RemoteMMARKeys.FILE_TYPE: "zip",
+        RemoteMMARKeys.HASH_TYPE: "md5",
+        RemoteMMARKeys.HASH_VAL: None,
+        RemoteMMARKeys.MODEL_FILE: os.path.join("models", "model.pt"),
+    }
+
+
+class _FakeResponse(io.BytesIO):
+    """an in-memory HTTP response returned by `_fake_urlopen`."""
+
+    def __init__(self, content=b"", code=200, headers=None, url="https://localhost/mmar.zip"):
+        super().__init__(content)
+        self.code, self.headers, self.url = code, headers or {}, url
+
+    def getcode(self):
+        return self.code
+
+    def geturl(self):
+        return self.url
+
+
+def _fake_urlopen(content, range_code=206, short=False, error=None):
+    """
+    return a replacement of `urlopen` serving `content` with range requests.
+    The range requests respond with `range_code`, miss the last byte if `short`, or raise `error`
+    (except the first one-byte range request probing the size).
+    """
+
+    def _urlopen(req, timeout=None):
+        if req.get_method() != "GET":
+            raise ValueError(f"unexpected method {req.get_method()}")
+        if range_code != 206:
+            return _FakeResponse(content, code=range_code)
+        byte_range = req.get_header("Range")
+        if error is not None and byte_range != "bytes=0-0":
+            raise error
+        start, end = (int(i) for i in byte_range[len("bytes=") :].split("-"))
+        headers = {"Content-Range": f"bytes {start}-{end}/{len(content)}"}
+        return _FakeResponse(content[start : end if short else end + 1], code=206, headers=headers)
+
+    return _urlopen
+
+
 class TestMMMARDownload(unittest.TestCase):
     @parameterized.expand(TEST_CASES)
     @skip_if_quick
@@ -133,11 +215,273 @@ class TestMMMARDownload(unittest.TestCase):
         x = next(output.parameters())  # verify the first element
         np.testing.assert_allclose(x[0][0].detach().cpu().numpy(), expected_val, rtol=1e-3, atol=1e-3)
 
+    def test_load_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            item = _create_local_mmar(tmp_dir)
+            mmar_dir = os.path.join(tmp_dir, "mmars")
+            kwargs = {"mmar_dir": mmar_dir, "progress": False, "weights_only": True, "mmap": False, "use_cache": True}
+            weights = load_from_mmar(item, **kwargs)
+            shutil.rmtree(mmar_dir)
+            cached = load_from_mmar(item, **kwargs)  # no download required
+            with self.assertRaises(FileNotFoundError):  # a different item with the same ID is not cached
+                load_from_mmar({**item, RemoteMMARKeys.MODEL_FILE: "missing.pt"}, **kwargs)
+            load_from_mmar.cache_clear()
+        self.assertIsNot(weights, cached)
+        self.assertEqual(sorted(weights), ["bias", "weight"])
+        self.assertTrue(torch.equal(weights["weight"], cached["weight"]))
+
+    @parameterized.expand([[False, True], [True, True], [False, False]])
+    def test_load_config_file(self, use_orjson, mmap):
+        if use_orjson and not has_orjson:
+            self.skipTest("orjson is not installed")
+        weights = torch.nn.Linear(2, 3).state_dict()
+        config = {**LINEAR_CONF, "learning_rate": float("nan")}  # `NaN` is rejected by orjson
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            item = _create_local_mmar(tmp_dir, model_dict=weights, config=config)
+            mmar_dir = os.path.join(tmp_dir, "mmars")
+            with mock.patch("monai.apps.mmars.mmars.has_orjson", use_orjson), mock.patch(
+                "monai.apps.mmars.mmars._READ_POOL.submit", wraps=_READ_POOL.submit
+            ) as submit:
+                model = load_from_mmar(item, mmar_dir=mmar_dir, progress=False, mmap=mmap)
+                # without memory-mapping, the model file is read while the config file is parsed
+                self.assertEqual(submit.call_count, int(not mmap or not has_option(torch.load, "mmap")))
+            self.assertIsInstance(model, torch.nn.Linear)
+            self.assertTrue(torch.equal(model.weight.detach(), weights["weight"]))
+            del model
+
+    def test_load_flat(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            item = _create_local_mmar(tmp_dir)
+            mmar_dir = os.path.join(tmp_dir, "mmars")
+            kwargs = {"mmar_dir": mmar_dir, "progress": False, "mmap": False, "flat_cache": True}
+            weights = load_from_mmar(item, weights_only=True, **kwargs)
+            model_file = os.path.join(mmar_dir, item[RemoteMMARKeys.ID], item[RemoteMMARKeys.MODEL_FILE])
+            self.assertTrue(os.path.exists(f"{model_file}.index.json"))
+            expected_files = ["model.pt", "model.pt.bin", "model.pt.index.json"]  # no temporary files left
+            self.assertEqual(sorted(os.listdir(os.path.dirname(model_file))), expected_files)
+            with mock.patch("torch.load", side_effect=RuntimeError("the flat weights should be loaded")):
+                flat_weights = load_from_mmar(item, weights_only=True, **kwargs)
+                model = load_from_mmar(item, **kwargs)  # `train_conf` is restored from the flat index
+            for key in ("weight", "bias"):
+                self.assertEqual(weights[key].dtype, flat_weights[key].dtype)
+                self.assertTrue(torch.equal(weights[key], flat_weights[key]))
+                self.assertTrue(torch.equal(weights[key], getattr(model, key).detach()))
+            del flat_weights, model
+
+    def test_load_flat_fallback(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            item = _create_local_mmar(tmp_dir)
+            mmar_dir = os.path.join(tmp_dir, "mmars")
+            kwargs = {"mmar_dir": mmar_dir, "progress": False, "weights_only": True, "flat_cache": True}
+            model_file = os.path.join(mmar_dir, item[RemoteMMARKeys.ID], item[RemoteMMARKeys.MODEL_FILE])
+            index_file = f"{model_file}.index.json"
+            load_from_mmar(item, map_location={"cpu": "cpu"}, **kwargs)
+            self.assertFalse(os.path.exists(index_file))  # not supported by the flat weights
+
+            load_from_mmar(item, map_location="cpu", **kwargs)
+            with open(index_file) as f:
+                self.assertIsNone(json.load(f)["tensors"]["weight"][3])  # the source devices are unknown
+            with mock.patch("torch.load", wraps=torch.load) as load:
+                load_from_mmar(item, map_location="cpu", **kwargs)
+                load.assert_not_called()
+                load_from_mmar(item, **kwargs)  # loaded by `torch.load` to get the source devices
+                load.assert_called_once()
+                load_from_mmar(item, **kwargs)
+                load.assert_called_once()
+            with open(index_file) as f:
+                self.assertEqual(json.load(f)["tensors"]["weight"][3], "cpu")
+
+            for corrupt_file, content in ((index_file, "{"), (f"{model_file}.bin", "")):
+                with open(corrupt_file, "w") as f:
+                    f.write(content)
+                with self.assertWarns(UserWarning), mock.patch("torch.load", wraps=torch.load) as load:
+                    weights = load_from_mmar(item, **kwargs)
+                    load.assert_called_once()
+                self.assertEqual(sorted(weights), ["bias", "weight"])
+                with mock.patch("torch.load", side_effect=RuntimeError("the flat weights should be loaded")):
+                    load_from_mmar(item, **kwargs)  # the flat weights are saved again
+            del weights
+
+    def test_load_flat_tuple_conf(self):
+        model_dict = {"model": torch.nn.Linear(2, 3).state_dict(), "train_conf": {**LINEAR_CONF, "shape": (2, 3)}}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            item = _create_local_mmar(tmp_dir, model_dict)
+            mmar_dir = os.path.join(tmp_dir, "mmars")
+            model = load_from_mmar(item, mmar_dir=mmar_dir, progress=False, flat_cache=True)
+            self.assertIsInstance(model, torch.nn.Linear)
+            model_file = os.path.join(mmar_dir, item[RemoteMMARKeys.ID], item[RemoteMMARKeys.MODEL_FILE])
+            self.assertFalse(os.path.exists(f"{model_file}.index.json"))  # the tuple is not preserved by JSON
+            del model
+
+    @parameterized.expand([[torch.float32], [torch.float16]])
+    def test_load_mmap(self, dtype):
+        weights = {k: v.to(dtype) for k, v in torch.nn.Linear(2, 3).state_dict().items()}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            item = _create_local_mmar(tmp_dir, {"model": weights, "train_conf": LINEAR_CONF})
+            mmar_dir = os.path.join(tmp_dir, "mmars")
+            model = load_from_mmar(item, mmar_dir=mmar_dir, progress=False, mmap=True, flat_cache=False)
+            self.assertIsInstance(model, torch.nn.Linear)
+            for name, param in model.state_dict().items():
+                self.assertEqual(param.dtype, torch.float32)  # the module keeps its own dtype
+                self.assertEqual(param.device, torch.device("cpu"))
+                self.assertTrue(torch.equal(param, weights[name].float()))
+            del model
+
+    def test_download_skip(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            item = _create_local_mmar(tmp_dir)
+            with open(os.path.join(tmp_dir, "local_mmar_1.zip"), "rb") as f:
+                item[RemoteMMARKeys.HASH_VAL] = hashlib.md5(f.read()).hexdigest()
+            mmar_dir = os.path.join(tmp_dir, "mmars")
+            hash_file = os.path.join(mmar_dir, "local_mmar_1.zip.md5")
+            marker = os.path.join(mmar_dir, "local_mmar_1", "marker.txt")
+            with mock.patch("monai.apps.mmars.mmars.download_and_extract", wraps=download_and_extract) as extract:
+                model_dir = download_mmar(item, mmar_dir=mmar_dir, progress=False)
+                self.assertEqual(extract.call_count, 1)
+                with open(hash_file) as f:
+                    self.assertEqual(f.read(), item[RemoteMMARKeys.HASH_VAL])
+                open(marker, "w").close()
+
+                download_mmar(item, mmar_dir=mmar_dir, progress=False)  # already extracted
+                self.assertEqual(extract.call_count, 1)
+                self.assertTrue(os.path.exists(marker))
+
+                download_mmar(item, mmar_dir=mmar_dir, progress=False, force=True)  # extracted again
+                self.assertEqual(extract.call_count, 2)
+                self.assertFalse(os.path.exists(marker))
+                self.assertTrue(os.path.exists(os.path.join(model_dir, item[RemoteMMARKeys.MODEL_FILE])))
+
+                with open(hash_file, "w") as f:
+                    f.write("0" * 32)
+                download_mmar(item, mmar_dir=mmar_dir, progress=False)  # the recorded hash does not match
+                self.assertEqual(extract.call_count, 3)
+                with open(hash_file) as f:
+                    self.assertEqual(f.read(), item[RemoteMMARKeys.HASH_VAL])
+
+    @SkipIfBeforePyTorchVersion((1, 13))
+    def test_load_weights_only(self):
+        weights = torch.nn.Linear(2, 3).state_dict()
+        model_dict = {"model": weights, "train_conf": LINEAR_CONF, "args": argparse.Namespace(lr=0.1)}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            item = _create_local_mmar(tmp_dir, model_dict)
+            kwargs = {"mmar_dir": os.path.join(tmp_dir, "mmars"), "progress": False, "flat_cache": False}
+            with self.assertWarns(UserWarning):  # not loadable by the restricted unpickler
+                loaded = load_from_mmar(item, weights_only=True, **kwargs)
+            self.assertTrue(torch.equal(loaded["weight"], weights["weight"]))
+            model = load_from_mmar(item, weights_only=False, **kwargs)
+            self.assertTrue(torch.equal(model.weight.detach(), weights["weight"]))
+            del loaded, model
+
+    @parameterized.expand(
+        [
+            [{}, True],
+            [{"range_code": 200}, False],
+            [{"short": True}, False],
+            [{"error": http.client.RemoteDisconnected("closed")}, False],
+        ]
+    )
+    def test_download_ranges(self, server_args, expected):
+        content = os.urandom(10000)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filepath = os.path.join(tmp_dir, "mmar", "mmar.zip")
+            with mock.patch("monai.apps.mmars.mmars.urlopen", _fake_urlopen(content, **server_args)):
+                with mock.patch("monai.apps.mmars.mmars.RANGE_PART_BYTES", 1000):
+                    downloaded = _download_ranges("https://localhost/mmar.zip", filepath, progress=False)
+            self.assertEqual(downloaded, expected)
+            self.assertFalse(os.path.exists(f"{filepath}.part"))
+            if expected:
+                with open(filepath, "rb") as f:
+                    self.assertEqual(f.read(), content)
+            else:
+                self.assertFalse(os.path.exists(filepath))
+
+    def test_download_mmar_ranges(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            item = _create_local_mmar(tmp_dir)
+            with open(os.path.join(tmp_dir, "local_mmar_1.zip"), "rb") as f:
+                content = f.read()
+            item[RemoteMMARKeys.URL] = "https://localhost/local_mmar_1.zip"
+            mmar_dir = os.path.join(tmp_dir, "mmars")
+            with mock.patch("monai.apps.mmars.mmars.urlopen", _fake_urlopen(content)), mock.patch(
+                "monai.apps.mmars.mmars.RANGE_PART_BYTES", -(-len(content) // 4)
+            ), mock.patch("monai.apps.utils._urlretrieve", side_effect=RuntimeError("should be downloaded by ranges")):
+                model_dir = download_mmar(item, mmar_dir=mmar_dir, progress=False)
+            with open(os.path.join(mmar_dir, "local_mmar_1.zip"), "rb") as f:
+                self.assertEqual(f.read(), content)
+            self.assertTrue(os.path.exists(os.path.join(model_dir, item[RemoteMMARKeys.MODEL_FILE])))
+
+    def test_parallel_load_state_dict(self):
+        net = torch.nn.Sequential(*[torch.nn.Linear(2, 2) for _ in range(150)])  # 300 keys
+        weights = torch.nn.Sequential(*[torch.nn.Linear(2, 2) for _ in range(150)]).state_dict()
+        _parallel_load_state_dict(net, weights)
+        for name, val in net.state_dict().items():
+            self.assertTrue(torch.equal(val, weights[name]))
+
+        with self.assertRaises(RuntimeError):  # mismatched keys
+            _parallel_load_state_dict(net, {k: v for k, v in weights.items() if k != "0.weight"})
+        with self.assertRaises(RuntimeError):  # mismatched shapes
+            _parallel_load_state_dict(net, {**weights, "0.weight": torch.zeros(3, 2)})
+
+        hook = mock.Mock()
+        net[1]._register_load_state_dict_pre_hook(hook)  # falls back to `load_state_dict` to run the hook
+        _parallel_load_state_dict(net, weights)
+        hook.assert_called_once()
+
+    def test_parallel_load_normalized(self):
+        def _net():
+            blocks = [(torch.nn.Linear(2, 2), torch.nn.BatchNorm1d(2), torch.nn.InstanceNorm1d(2)) for _ in range(40)]
+            return torch.nn.Sequential(*[torch.nn.Sequential(*block) for block in blocks])  # 280 keys
+
+        net, weights = _net(), _net().state_dict()
+        for val in weights.values():
+            val.copy_(torch.randint_like(val, 1, 10))  # including the running statistics and `num_batches_tracked`
+        with mock.patch.object(net, "load_state_dict", wraps=net.load_state_dict) as load:
+            _parallel_load_state_dict(net, weights)  # the normalization layers are copied in parallel
+            load.assert_not_called()
+            _parallel_load_state_dict(net, {k: v for k, v in weights.items() if not k.endswith("num_batches_tracked")})
+            load.assert_called_once()  # `num_batches_tracked` is filled in by `load_state_dict`
+        for name, val in net.state_dict().items():
+            self.assertTrue(torch.equal(val, weights[name]))
+
     def test_unique(self):
         # model ids are unique
         keys = sorted([m["id"] for m in MODEL_DESC])
         self.assertTrue(keys == sorted(set(keys)))
 
+    def test_spec(self):
+        spec = _get_model_spec("clara_pt_prostate_mri_segmentation_1")
+        self.assertIs(spec, MODEL_DESC[0])
+        self.assertEqual(spec[RemoteMMARKeys.ID], spec.id)
+        self.assertIsNone(spec.config_file)
+        self.assertEqual(spec.get(RemoteMMARKeys.CONFIG_FILE, "config_train.json"), "config_train.json")
+        self.assertIsNone(spec.get(RemoteMMARKeys.HASH_VAL, "hash"))  # a required field which is None
+        self.assertEqual(spec.get("unknown", "default"), "default")
+        self.assertIn(RemoteMMARKeys.ID, spec)
+        self.assertNotIn(RemoteMMARKeys.CONFIG_FILE, spec)
+        self.assertNotIn("unknown", spec)
+        self.assertEqual(tuple(spec.keys()), MMARSpec._fields[:-1])
+        self.assertEqual(tuple(spec.values()), tuple(spec)[:-1])
+        self.assertEqual(dict(spec), dict(spec.items()))
+        self.assertEqual(dict(spec)[RemoteMMARKeys.URL], spec.url)
+        self.assertEqual(_get_model_spec(dict(spec)), spec)
+        self.assertIsInstance(_get_model_spec(0), MMARSpec)
+        for key in ("unknown", RemoteMMARKeys.CONFIG_FILE):
+            with self.assertRaises(KeyError):
+                spec[key]
+        spec = spec._replace(config_file="config.json")
+        self.assertEqual(spec[RemoteMMARKeys.CONFIG_FILE], "config.json")
+        self.assertEqual(dict(spec), dict(zip(MMARSpec._fields, spec)))
+
+    def test_spec_from_mapping(self):
+        spec_dict = dict(MODEL_DESC[0])
+        self.assertNotIn(RemoteMMARKeys.CONFIG_FILE, spec_dict)  # optional key
+        with self.assertWarns(UserWarning):  # unknown keys are ignored
+            self.assertEqual(_get_model_spec({**spec_dict, "unknown": 1}), MODEL_DESC[0])
+        self.assertEqual(_get_model_spec({**spec_dict, RemoteMMARKeys.CONFIG_FILE: None}), MODEL_DESC[0])
+        spec_dict.pop(RemoteMMARKeys.URL)
+        with self.assertRaises(KeyError):
+            _get_model_spec(spec_dict)
+
     @SkipIfAtLeastPyTorchVersion((1, 6))
     def test_no_default(self):
         with self.assertRaises(ValueError):
@@ -148,6 +492,8 @@ class TestMMMARDownload(unittest.TestCase):
         self.assertEqual(_get_val({"a": {"c": {"c": 4}}, "b": {"c": 2}}, key="b"), {"c": 2})
         self.assertEqual(_get_val({"a": {"c": 4}, "b": {"c": 2}}, key="c"), 4)
         self.assertEqual(_get_val({"a": {"c": None}, "b": {"c": 2}}, key="c"), 2)
+        self.assertEqual(_get_val({"a": {"b": {"c": 1}}, "d": {"c": 2}}, key="c"), 2)  # breadth first
+        self.assertEqual(_get_val({"a": {"b": 1}}, key="c", default=3), 3)
 
 
 if __name__ == "__main__":